@@ -0,0 +1,200 @@
+"""
+Command-line batch runner for long simulations.
+
+Paths are simulated in chunks so memory stays bounded, and a checkpoint with
+running totals and the RNG state is written after every chunk, so an
+interrupted job picks up where it stopped and gives the same results as an
+uninterrupted one.
+
+Usage:
+    python -m src.batch_runner data/batch_spec.json --output runs/baseline
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.forecast_simulation import INTERVAL, draw_random_block, simulate_streams
+from src.scenario_engine import build_cells, stack_cells
+
+CHECKPOINT = 'checkpoint.json'
+TOTALS = 'totals_{:05d}.npz'
+SUMMARY = 'summary.csv'
+
+
+def load_spec(path):
+    """
+    Reads a JSON spec with keys: strategies (list of [name, weights]),
+    parameters (see expand_parameter_grid), years, paths, and optionally
+    chunk_size, seed and target_layer.
+    """
+    with open(path) as f:
+        spec = json.load(f)
+
+    missing = [key for key in ('strategies', 'years', 'paths') if key not in spec]
+    if missing:
+        raise ValueError(f"Spec {path} is missing {', '.join(missing)}")
+
+    spec.setdefault('parameters', None)
+    spec.setdefault('chunk_size', 1000)
+    # a fixed default seed keeps every job reproducible and resumable
+    spec.setdefault('seed', 0)
+    spec.setdefault('target_layer', 5)
+    return spec
+
+
+def spec_hash(spec):
+    """Fingerprint of everything that changes the results."""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def save_checkpoint(output, state, totals):
+    """
+    Writes the running totals of this chunk, then atomically swaps in the
+    checkpoint pointing at them, so a crash at any point leaves a consistent
+    checkpoint behind. Totals of the previous chunk are removed afterwards.
+    """
+    previous = state.get('totals')
+    state['totals'] = TOTALS.format(state['chunk'])
+    with open(os.path.join(output, state['totals']), 'wb') as f:
+        np.savez(f, **totals)
+
+    checkpoint_path = os.path.join(output, CHECKPOINT)
+    with open(checkpoint_path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+    if previous and previous != state['totals']:
+        os.remove(os.path.join(output, previous))
+
+
+def load_checkpoint(output, fingerprint):
+    """Returns (state, totals) of an earlier run of the same spec, or (None, None)."""
+    path = os.path.join(output, CHECKPOINT)
+    if not os.path.exists(path):
+        return None, None
+
+    with open(path) as f:
+        state = json.load(f)
+    if state['spec_hash'] != fingerprint:
+        raise ValueError(f"Checkpoint in {output} belongs to a different spec, use --restart to overwrite it")
+
+    with np.load(os.path.join(output, state['totals'])) as data:
+        totals = {key: data[key] for key in data.files}
+    return state, totals
+
+
+def summarize(cells, totals, paths, months):
+    """Mean and standard deviation per scenario, strategy and month."""
+    rows = []
+    for i, (scenario, parameters, strat_name, _) in enumerate(cells):
+        for metric in ('Revenue', 'Profit'):
+            mean = totals[f'{metric}_sum'][i] / paths
+            var = np.maximum(totals[f'{metric}_sumsq'][i] / paths - mean**2, 0)
+            for month in range(months):
+                rows.append({
+                    'Scenario': scenario,
+                    **(parameters or {}),
+                    'Strategy': strat_name,
+                    'Month': month + 1,
+                    'Metric': metric,
+                    'Mean': mean[month],
+                    'Std': np.sqrt(var[month]),
+                })
+
+    summary = pd.DataFrame(rows)
+    parameter_names = sorted({name for _, parameters, _, _ in cells for name in (parameters or {})})
+    return summary[['Scenario', *parameter_names, 'Strategy', 'Month', 'Metric', 'Mean', 'Std']]
+
+
+def run_batch(spec, output, restart=False, save_paths=False):
+    """
+    Runs a spec in chunks of paths, checkpointing after each chunk.
+
+    Parameters:
+    - spec: Spec dict, see load_spec.
+    - output: Directory for the checkpoint, chunk files and summary.
+    - restart: Ignore any existing checkpoint.
+    - save_paths: Also keep the simulated paths of every chunk.
+
+    Returns:
+    - The summary DataFrame.
+    """
+    os.makedirs(output, exist_ok=True)
+    fingerprint = spec_hash(spec)
+
+    cells, compiled = build_cells(spec['strategies'], spec['parameters'], spec['target_layer'])
+    stacked, index = stack_cells(cells, compiled)
+    months = spec['years'] * INTERVAL
+    n_streams = stacked['revenue'].shape[-1]
+
+    rng = np.random.default_rng(spec['seed'])
+    state, totals = (None, None) if restart else load_checkpoint(output, fingerprint)
+
+    if state is None:
+        state = {'spec_hash': fingerprint, 'completed_paths': 0, 'chunk': 0}
+        totals = {
+            f'{metric}_{moment}': np.zeros((len(cells), months))
+            for metric in ('Revenue', 'Profit') for moment in ('sum', 'sumsq')
+        }
+    else:
+        rng.bit_generator.state = state['rng_state']
+        print(f"Resuming from chunk {state['chunk']}, {state['completed_paths']}/{spec['paths']} paths done")
+
+    start = time.time()
+    resumed_paths = state['completed_paths']
+
+    while state['completed_paths'] < spec['paths']:
+        size = min(spec['chunk_size'], spec['paths'] - state['completed_paths'])
+
+        draws = draw_random_block(rng, size, months, n_streams)
+        revenue, profit = simulate_streams(stacked, draws)
+        revenue, profit = revenue[index], profit[index]
+
+        for metric, values in (('Revenue', revenue), ('Profit', profit)):
+            totals[f'{metric}_sum'] += values.sum(axis=1)
+            totals[f'{metric}_sumsq'] += (values**2).sum(axis=1)
+
+        if save_paths:
+            np.savez(os.path.join(output, f"chunk_{state['chunk']:05d}.npz"), revenue=revenue, profit=profit)
+
+        state['completed_paths'] += size
+        state['chunk'] += 1
+        state['rng_state'] = rng.bit_generator.state
+        save_checkpoint(output, state, totals)
+
+        elapsed = time.time() - start
+        throughput = (state['completed_paths'] - resumed_paths) / elapsed if elapsed > 0 else float('inf')
+        eta = (spec['paths'] - state['completed_paths']) / throughput
+        print(
+            f"chunk {state['chunk']}: {state['completed_paths']}/{spec['paths']} paths, "
+            f"{throughput:,.0f} paths/s, ETA {eta:,.0f}s"
+        )
+
+    summary = summarize(cells, totals, spec['paths'], months)
+    summary.to_csv(os.path.join(output, SUMMARY), index=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run forecast simulations as a restartable batch job.")
+    parser.add_argument('spec', help="JSON file with strategies, parameters, years and paths")
+    parser.add_argument('--output', required=True, help="directory for checkpoints and results")
+    parser.add_argument('--chunk-size', type=int, help="paths per chunk, overrides the spec")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--save-paths', action='store_true', help="keep simulated paths of every chunk")
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    if args.chunk_size:
+        spec['chunk_size'] = args.chunk_size
+
+    run_batch(spec, args.output, restart=args.restart, save_paths=args.save_paths)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,10 @@ from src.optimizer import *
 
 # intervals per year
 INTERVAL = 12
+DT = 1 / INTERVAL
+
+# black swan magnitude range, loss up to 30% or gain up to 50%
+SHOCK_RANGE = (-0.3, 0.5)
 
 def run_simulations(weights, years, parameters=None, n=20):
     """
@@ -57,3 +61,83 @@ def run_all_simulations(strategies, years, parameters, n=20):
 
     return all_results
 
+
+def compile_streams(tree, target_layer=5):
+    """
+    Flattens a tree into arrays for vectorized simulation.
+
+    Every leaf at target_layer is a stochastic revenue stream, every other
+    leaf keeps its static revenue. Root revenue is then
+    static + sum(weight * stream revenue), matching update_all.
+    """
+    streams = {'name': [], 'revenue': [], 'mu': [], 'sigma': [], 'shock_probability': [], 'weight': []}
+    static = 0.0
+
+    queue = deque([(tree.root, 0, 1.0)])
+    while queue:
+        node, level, weight = queue.popleft()
+
+        if node.sub_units:
+            for child in node.sub_units:
+                queue.append((child, level + 1, weight * child.contribution))
+        elif level == target_layer:
+            streams['name'].append(node.name)
+            streams['revenue'].append(node.revenue)
+            streams['mu'].append((node.min_trend + node.max_trend) / 2)
+            streams['sigma'].append(np.abs(node.max_trend - node.min_trend) / 4)
+            streams['shock_probability'].append(np.abs(node.max_trend - node.min_trend) * .001)
+            streams['weight'].append(weight)
+        else:
+            static += weight * node.revenue
+
+    compiled = {key: np.array(values, dtype=np.float64) for key, values in streams.items() if key != 'name'}
+    compiled['name'] = streams['name']
+    compiled['static'] = static
+    compiled['margin'] = tree.root.margin
+    return compiled
+
+
+def draw_random_block(rng, paths, months, n_streams):
+    """
+    Draws every random number a simulation of paths x months needs up front,
+    so the same block can be shared across scenarios for paired comparisons.
+    """
+    return {
+        'epsilon': rng.standard_normal((paths, months, n_streams)),
+        'shock_u': rng.random((paths, n_streams)),
+        'shock_magnitude': rng.uniform(*SHOCK_RANGE, size=(paths, n_streams)),
+    }
+
+
+def simulate_streams(streams, draws, brownian=None, start_month=0):
+    """
+    Vectorized geometric brownian motion for every stream, path and month.
+
+    Stream arrays may carry leading axes (e.g. one row per scenario cell),
+    which broadcast against the shared draws. The black swan shock hits
+    the reported value at each horizon, as in HierarchyTree.random_walk.
+    Paths continue from brownian (paths, streams) at start_month if given.
+
+    Returns (revenue, profit) at the root with shape (..., paths, months).
+    """
+    epsilon = draws['epsilon']
+    months = epsilon.shape[1]
+
+    # add axes for paths and months
+    mu = streams['mu'][..., None, None, :]
+    sigma = streams['sigma'][..., None, None, :]
+    revenue = streams['revenue'][..., None, None, :]
+    weight = streams['weight'][..., None, None, :]
+
+    t = np.arange(start_month + 1, start_month + months + 1)[:, None] * DT
+    brownian = np.cumsum(epsilon, axis=1) + (0 if brownian is None else brownian[:, None, :])
+    log_growth = (mu - 0.5 * sigma**2) * t + sigma * np.sqrt(DT) * brownian
+
+    shocked = draws['shock_u'] < streams['shock_probability'][..., None, :]
+    shock = np.where(shocked, 1 + draws['shock_magnitude'], 1.0)[..., None, :]
+
+    stream_revenue = revenue * np.exp(log_growth) * shock
+    total_revenue = np.asarray(streams['static'])[..., None, None] + np.sum(weight * stream_revenue, axis=-1)
+    profit = total_revenue * np.asarray(streams['margin'])[..., None, None]
+
+    return total_revenue, profit
@@ -11,6 +11,65 @@ from data.hierarchy import Acme
 from src.optimizer import ContributionOptimizer
 from figure_settings.fig_settings import *
 
+# numeric node attributes exported by node_arrays
+NODE_COLUMNS = ('revenue', 'margin', 'contribution', 'min_contribution', 'max_contribution', 'min_trend', 'max_trend')
+
+# layouts keyed by tree structure (parent index of every node)
+_LAYOUT_CACHE = {}
+
+
+def tree_layout(parents, prog="dot"):
+    """
+    Positions for a tree given as parent indices in breadth first order.
+
+    Uses graphviz when available and falls back to a linear time layout that
+    spaces leaves evenly and centres each parent above its children.
+    Layouts are cached per structure, so redrawing the same tree is free.
+    """
+    key = (prog, tuple(parents.tolist()))
+    if key in _LAYOUT_CACHE:
+        return _LAYOUT_CACHE[key]
+
+    n = len(parents)
+    try:
+        G = nx.DiGraph()
+        G.add_nodes_from(range(n))
+        G.add_edges_from((parent, i) for i, parent in enumerate(parents) if parent >= 0)
+        pos = nx.nx_agraph.graphviz_layout(G, prog=prog, args="-Gnodesep=4")
+    except ImportError:
+        children = [[] for _ in range(n)]
+        for i, parent in enumerate(parents):
+            if parent >= 0:
+                children[parent].append(i)
+
+        # depth first leaf order keeps subtrees together
+        x = np.zeros(n)
+        leaf = 0
+        stack = [i for i, parent in enumerate(parents) if parent < 0][::-1]
+        order = []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if children[node]:
+                stack.extend(reversed(children[node]))
+            else:
+                x[node] = leaf
+                leaf += 1
+
+        depth = np.zeros(n)
+        for node in order:
+            if parents[node] >= 0:
+                depth[node] = depth[parents[node]] + 1
+        for node in reversed(order):
+            if children[node]:
+                x[node] = np.mean(x[children[node]])
+
+        pos = {i: (x[i], -depth[i]) for i in range(n)}
+
+    _LAYOUT_CACHE[key] = pos
+    return pos
+
+
 class HierarchyTree:
     def __init__(self, parameters = None):
         self.build_tree(parameters)
@@ -219,51 +278,117 @@ class HierarchyTree:
         for child in node.sub_units:
             self.build_graph(graph, child, unique_node_id, unique_id_counter)
 
-    def print_tree(self):
-        """Generates and displays a hierarchical visualization of the tree."""
-        unique_id_counter = count()  
-        G = nx.DiGraph() 
+    def node_arrays(self, root=None):
+        """Flattens the hierarchy breadth first into columnar arrays, parent is -1 for the root."""
+        if root is None:
+            root = self.root
 
+        names, parents, levels = [], [], []
+        columns = {key: [] for key in NODE_COLUMNS}
 
-        self.build_graph(G, self.root, unique_id_counter=unique_id_counter) 
+        queue = deque([(root, -1, 0)])
+        while queue:
+            node, parent, level = queue.popleft()
+            index = len(names)
 
-        plt.figure(figsize=(30, 15))
+            names.append(node.name)
+            parents.append(parent)
+            levels.append(level)
+            for key, column in columns.items():
+                column.append(getattr(node, key))
 
-        pos = nx.nx_agraph.graphviz_layout(G, prog="dot", args="-Gnodesep=4")
-        labels = nx.get_node_attributes(G, 'label')
+            for child in node.sub_units:
+                queue.append((child, index, level + 1))
 
-        nx.draw(G, pos, with_labels=True, labels=labels, 
-                node_size=10000, cmap=plt.cm.Blues, 
-                edge_color="gray", font_size=12)
+        arrays = {key: np.array(column, dtype=np.float64) for key, column in columns.items()}
+        arrays['name'] = np.array(names, dtype=object)
+        arrays['parent'] = np.array(parents, dtype=np.int64)
+        arrays['level'] = np.array(levels, dtype=np.int64)
+        return arrays
 
-        plt.title("Company Hierarchy Visualization with Financial Details", fontsize=35)
-        plt.show()
+    def collapse(self, arrays, max_nodes=200):
+        """
+        Level of detail: keeps the deepest levels that fit in max_nodes.
+        Returns the visible node indices and the number of hidden descendants of each.
+        """
+        n = len(arrays['parent'])
+        hidden = np.zeros(n, dtype=np.int64)
 
-    def to_dataframe(self):
-        """Recursively build a DataFrame representation of the hierarchy."""
-        rows = []
+        if n <= max_nodes:
+            return np.arange(n), hidden
 
-        queue =deque([(self.root, 0)])
-        while queue:
-            node, level = queue.popleft()
-            rows.append({
-                'Level': level,
-                'Name': node.name,
-                'Total Revenue': node.revenue,
-                'Margin': node.margin,
-                'Contribution': node.contribution,
-                'Min_Contribution': node.min_contribution,
-                'Max_Contribution': node.max_contribution,
-                'Min_Trend': node.min_trend,
-                'Max_Trend': node.max_trend,
-            })
+        # nodes per level are contiguous in breadth first order
+        per_level = np.bincount(arrays['level'])
+        depth = max(np.searchsorted(np.cumsum(per_level), max_nodes, side='right') - 1, 0)
 
-            for child in node.sub_units:
-                queue.append((child, level+1))
+        # count descendants bottom up, children always come after their parent
+        descendants = np.zeros(n, dtype=np.int64)
+        for i in range(n - 1, 0, -1):
+            descendants[arrays['parent'][i]] += descendants[i] + 1
+
+        visible = np.flatnonzero(arrays['level'] <= depth)
+        hidden[visible] = np.where(arrays['level'][visible] == depth, descendants[visible], 0)
+        return visible, hidden
+
+    def print_tree(self, max_nodes=200, label_nodes=60):
+        """
+        Generates and displays a hierarchical visualization of the tree.
+
+        Subtrees below the deepest level that fits in max_nodes are collapsed,
+        and full financial labels are only drawn up to label_nodes nodes.
+        """
+        arrays = self.node_arrays()
+        visible, hidden = self.collapse(arrays, max_nodes)
+        parents = arrays['parent'][visible]
+
+        pos = tree_layout(parents)
+        n_visible = len(visible)
+
+        labels = {}
+        for i, node in enumerate(visible):
+            label = arrays['name'][node]
+            if n_visible <= label_nodes:
+                label += (
+                    f"\nRev: {round(arrays['revenue'][node], 3)}"
+                    f"\nMargin: {round(arrays['margin'][node], 3)}"
+                    f"\nTrend: [{round(arrays['min_trend'][node], 3)}, {round(arrays['max_trend'][node], 3)}]"
+                    f"\nContrib:  {round(arrays['contribution'][node], 3)}"
+                )
+            if hidden[node]:
+                label += f"\n(+{hidden[node]} collapsed)"
+            labels[i] = label
+
+        # map parent indices onto positions in the visible set
+        position = np.full(len(arrays['parent']), -1)
+        position[visible] = np.arange(n_visible)
+        G = nx.DiGraph()
+        G.add_nodes_from(range(n_visible))
+        G.add_edges_from((position[parent], i) for i, parent in enumerate(parents) if parent >= 0)
+
+        plt.figure(figsize=(30, 15))
 
+        nx.draw(G, pos, with_labels=True, labels=labels,
+                node_size=min(10000, 2e6 / n_visible), cmap=plt.cm.Blues,
+                edge_color="gray", font_size=12 if n_visible <= label_nodes else 6)
 
+        plt.title("Company Hierarchy Visualization with Financial Details", fontsize=35)
+        plt.show()
 
-        return pd.DataFrame(rows)
+    def to_dataframe(self):
+        """Build a DataFrame representation of the hierarchy from its node arrays."""
+        arrays = self.node_arrays()
+
+        return pd.DataFrame({
+            'Level': arrays['level'],
+            'Name': arrays['name'],
+            'Total Revenue': arrays['revenue'],
+            'Margin': arrays['margin'],
+            'Contribution': arrays['contribution'],
+            'Min_Contribution': arrays['min_contribution'],
+            'Max_Contribution': arrays['max_contribution'],
+            'Min_Trend': arrays['min_trend'],
+            'Max_Trend': arrays['max_trend'],
+        })
     
 
     def print_df(self):
@@ -0,0 +1,192 @@
+import copy
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from src.hierarchy_tree import HierarchyTree
+from src.forecast_simulation import INTERVAL, compile_streams, draw_random_block, simulate_streams
+
+
+def _freeze(mapping):
+    """Hashable key for a parameter or weight dict, None maps to the defaults."""
+    return tuple(sorted(mapping.items())) if mapping else ()
+
+
+def expand_parameter_grid(parameter_grid):
+    """
+    Expands parameter overrides into a list of scenarios.
+
+    Parameters:
+    - parameter_grid: Dict mapping a parameter name to a list of values
+      (Cartesian product is taken), or a list of parameter dicts.
+
+    Returns:
+    - A list of parameter dicts, None for the baseline.
+    """
+    if parameter_grid is None:
+        return [None]
+
+    if isinstance(parameter_grid, dict):
+        keys = list(parameter_grid)
+        return [dict(zip(keys, values)) for values in product(*(parameter_grid[key] for key in keys))]
+
+    return list(parameter_grid)
+
+
+def build_cells(strategies, parameter_grid, target_layer=5):
+    """
+    Builds and optimizes one tree per unique (parameters, weights) pair.
+
+    Returns:
+    - cells: List of (scenario index, parameters, strategy name, cell key).
+    - compiled: Dict mapping a cell key to its compiled streams.
+    """
+    scenarios = expand_parameter_grid(parameter_grid)
+
+    builds = {}
+    compiled = {}
+    cells = []
+    for scenario, parameters in enumerate(scenarios):
+        build_key = _freeze(parameters)
+        if build_key not in builds:
+            builds[build_key] = HierarchyTree(parameters)
+
+        for strat_name, weights in strategies:
+            cell_key = (build_key, _freeze(weights))
+            if cell_key not in compiled:
+                tree = copy.copy(builds[build_key])
+                tree.root = tree.copy_hierarchy()
+                tree.optimize(weights)
+                compiled[cell_key] = compile_streams(tree, target_layer)
+
+            cells.append((scenario, parameters, strat_name, cell_key))
+
+    return cells, compiled
+
+
+def stack_cells(cells, compiled):
+    """
+    Stacks the compiled streams of every unique cell along a leading axis.
+
+    Returns:
+    - stacked: Dict of stream arrays with one row per unique cell.
+    - index: Row of stacked for each entry in cells.
+    """
+    unique_keys = list(compiled)
+    stacked = {
+        key: np.stack([compiled[cell_key][key] for cell_key in unique_keys])
+        for key in ('revenue', 'mu', 'sigma', 'shock_probability', 'weight', 'static', 'margin')
+    }
+
+    position = {cell_key: i for i, cell_key in enumerate(unique_keys)}
+    index = np.array([position[cell_key] for _, _, _, cell_key in cells])
+    return stacked, index
+
+
+class SimulationRun:
+    """
+    A grid simulation that keeps the terminal state of every path, so it can
+    be extended with more paths or a longer horizon without recomputing
+    existing results. Extending gives the same distribution as a single
+    longer run.
+
+    Parameters:
+    - strategies: List of (name, weights) tuples.
+    - parameter_grid: Parameter overrides, see expand_parameter_grid.
+    - years: Number of years to simulate.
+    - n: Number of paths per cell.
+    - seed: Seed for the shared random draws.
+    """
+    def __init__(self, strategies, parameter_grid, years, n=20, seed=None, target_layer=5):
+        self.cells, compiled = build_cells(strategies, parameter_grid, target_layer)
+        self.streams, self.index = stack_cells(self.cells, compiled)
+        self.rng = np.random.default_rng(seed)
+
+        n_cells, n_streams = self.streams['revenue'].shape
+        self.months = years * INTERVAL
+
+        # terminal state of every path
+        self.brownian = np.zeros((0, n_streams))
+        self.shock_u = np.zeros((0, n_streams))
+        self.shock_magnitude = np.zeros((0, n_streams))
+
+        self.revenue = np.zeros((n_cells, 0, self.months))
+        self.profit = np.zeros((n_cells, 0, self.months))
+
+        self.extend(paths=n)
+
+    @property
+    def paths(self):
+        return self.brownian.shape[0]
+
+    def extend(self, paths=0, months=0):
+        """
+        Continues existing paths for extra months, then adds new independent
+        paths over the full horizon.
+        """
+        if months:
+            epsilon = self.rng.standard_normal((self.paths, months, self.brownian.shape[1]))
+            draws = {'epsilon': epsilon, 'shock_u': self.shock_u, 'shock_magnitude': self.shock_magnitude}
+            revenue, profit = simulate_streams(self.streams, draws, self.brownian, self.months)
+
+            self.revenue = np.concatenate([self.revenue, revenue], axis=2)
+            self.profit = np.concatenate([self.profit, profit], axis=2)
+            self.brownian = self.brownian + epsilon.sum(axis=1)
+            self.months += months
+
+        if paths:
+            draws = draw_random_block(self.rng, paths, self.months, self.brownian.shape[1])
+            revenue, profit = simulate_streams(self.streams, draws)
+
+            self.revenue = np.concatenate([self.revenue, revenue], axis=1)
+            self.profit = np.concatenate([self.profit, profit], axis=1)
+            self.brownian = np.concatenate([self.brownian, draws['epsilon'].sum(axis=1)])
+            self.shock_u = np.concatenate([self.shock_u, draws['shock_u']])
+            self.shock_magnitude = np.concatenate([self.shock_magnitude, draws['shock_magnitude']])
+
+        return self
+
+    def to_dataframe(self):
+        """Long-form DataFrame with one row per scenario, strategy, month and path."""
+        revenue, profit = self.revenue[self.index], self.profit[self.index]
+        cells = self.cells
+        n, months = self.paths, self.months
+
+        n_cells = len(cells)
+        parameter_names = sorted({name for _, parameters, _, _ in cells for name in (parameters or {})})
+
+        data = {
+            'Scenario': np.repeat([scenario for scenario, _, _, _ in cells], n * months),
+        }
+        for name in parameter_names:
+            values = [(parameters or {}).get(name, np.nan) for _, parameters, _, _ in cells]
+            data[name] = np.repeat(values, n * months)
+        data['Strategy'] = np.repeat([strat_name for _, _, strat_name, _ in cells], n * months)
+        data['Path'] = np.tile(np.repeat(np.arange(n), months), n_cells)
+        data['Month'] = np.tile(np.arange(1, months + 1), n_cells * n)
+        data['Revenue'] = revenue.ravel()
+        data['Profit'] = profit.ravel()
+
+        return pd.DataFrame(data)
+
+
+def run_scenario_grid(strategies, parameter_grid, years, n=20, seed=None, target_layer=5):
+    """
+    Simulates every strategy under every parameter scenario.
+
+    Equivalent builds and optimizations are only done once, and a single
+    block of random draws is shared by all cells so that differences between
+    cells are paired rather than swamped by sampling noise.
+
+    Parameters:
+    - strategies: List of (name, weights) tuples.
+    - parameter_grid: Parameter overrides, see expand_parameter_grid.
+    - years: Number of years to simulate.
+    - n: Number of paths per cell.
+    - seed: Seed for the shared random draws.
+
+    Returns:
+    - A long-form DataFrame with one row per scenario, strategy, month and path.
+    """
+    return SimulationRun(strategies, parameter_grid, years, n, seed, target_layer).to_dataframe()